@@ -9,9 +9,27 @@ load_dotenv()
 # Get the token and authenticate
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+
+class CachedDuckDuckGoSearchTool(DuckDuckGoSearchTool):
+    """DuckDuckGo search that answers repeated queries from memory.
+
+    The agent often repeats the same search while reasoning; only the first
+    one goes out over the network.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache: dict[str, str] = {}
+
+    def forward(self, query: str) -> str:
+        if query not in self._cache:
+            self._cache[query] = super().forward(query)
+        return self._cache[query]
+
+
 # Initialize the model with the token
 model = LiteLLMModel(model_id="gpt-4o-mini")  # or gpt-3.5-turbo
-agent = CodeAgent(tools=[DuckDuckGoSearchTool()], model=model)
+agent = CodeAgent(tools=[CachedDuckDuckGoSearchTool()], model=model)
 
 if __name__ == "__main__":
     result = agent.run("How many seconds would it take for a leopard at full speed to run through Pont des Arts?")
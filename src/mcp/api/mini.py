@@ -1,5 +1,8 @@
 # mini.py
+import operator
 import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from dotenv import load_dotenv
 from fastmcp import FastMCP
@@ -11,27 +14,51 @@ load_dotenv()
 # Create and configure the server
 mcp = FastMCP("Tools")
 
+# Built once at import; only the requested operation is evaluated per call
+_OPS = {"add": operator.add, "sub": operator.sub, "mul": operator.mul, "div": operator.truediv}
+
 @mcp.tool()
 def calculate(op: str, a: float, b: float) -> float:
     """Simple calculator: add/sub/mul/div"""
-    ops = {"add": a+b, "sub": a-b, "mul": a*b, "div": a/b}
-    return ops.get(op, 0)
+    func = _OPS.get(op)
+    return func(a, b) if func else 0.0
 
 # Set ngrok authentication token from environment variable
 auth_token = os.environ.get("NGROK_AUTH_TOKEN")
 if auth_token:
     ngrok.set_auth_token(auth_token)
 
-# Create a tunnel to expose the local server
+LOCAL_SSE_URL = "http://127.0.0.1:8000/sse"
+NGROK_TIMEOUT = 5  # seconds
+
+def sse_url(public_url: str) -> str:
+    return f"{public_url}/sse" if public_url.startswith('http') else f"https://{public_url}/sse"
+
+def print_late_url(future) -> None:
+    """Report a tunnel that came up after the startup timeout."""
+    if not future.cancelled() and future.exception() is None and future.result():
+        print(f"ngrok connected late, MCP Server available at: {sse_url(future.result())}")
+
+# Create a tunnel to expose the local server. The connect call runs in a
+# worker thread so a stalled ngrok cannot block server startup.
+executor = ThreadPoolExecutor(max_workers=1)
+future = executor.submit(lambda: ngrok.connect("8000").public_url)
 try:
-    public_url = ngrok.connect("8000").public_url
+    public_url = future.result(timeout=NGROK_TIMEOUT)
     if public_url:
-        sse_url = f"{public_url}/sse" if public_url.startswith('http') else f"https://{public_url}/sse"
-        print(f"MCP Server available at: {sse_url}")
+        print(f"MCP Server available at: {sse_url(public_url)}")
     else:
         print("Failed to establish ngrok connection: public_url is None")
+        print(f"MCP Server available locally at: {LOCAL_SSE_URL}")
+except FutureTimeoutError:
+    print(f"ngrok did not respond within {NGROK_TIMEOUT}s")
+    future.add_done_callback(print_late_url)
+    print(f"MCP Server available locally at: {LOCAL_SSE_URL}")
 except Exception as e:
     print(f"Error connecting to ngrok: {e}")
+    print(f"MCP Server available locally at: {LOCAL_SSE_URL}")
+finally:
+    executor.shutdown(wait=False)
 
 # Run the server
 mcp.run(transport="sse", port=8000)
\ No newline at end of file
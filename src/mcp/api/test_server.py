@@ -5,10 +5,14 @@ import requests
 url = "https://a2d7-193-166-15-251.ngrok-free.app/sse"  # Replace with your ngrok URL
 
 try:
-    response = requests.get(url, stream=True)
-    print(f"Status: {response.status_code}")
-    if response.status_code == 200:
-        print("Server is working!")
+    # The context manager closes the streaming connection once checked
+    with requests.get(url, stream=True, timeout=(2, 5)) as response:
+        print(f"Status: {response.status_code}")
+        if response.status_code == 200:
+            # Read one event line to confirm the server is streaming
+            first_line = next(response.iter_lines(), None)
+            print(f"First event: {first_line.decode() if first_line else None}")
+            print("Server is working!")
 except Exception as e:
     print(f"Error connecting to server: {e}")
     
\ No newline at end of file
@@ -1,7 +1,9 @@
 # test_with_anthropic.py
+import asyncio
 import os
 
 import anthropic
+import httpx
 from dotenv import load_dotenv
 
 # Load environment variables and make sure it works
@@ -10,31 +12,61 @@ api_key = os.environ.get('ANTHROPIC_API_KEY')
 if not api_key:
     raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
-# Create client with explicit API key
-client = anthropic.Anthropic(api_key=api_key)
+# Create one async client with explicit API key, shared by all requests so
+# they reuse the same HTTP/2 connection
+client = anthropic.AsyncAnthropic(
+    api_key=api_key,
+    http_client=httpx.AsyncClient(http2=True)
+)
 
-def call_llm() -> None:
+# Static instructions are sent as a system block marked for prompt caching.
+# Anthropic caches the prefix once it exceeds the model's minimum cacheable
+# length; dynamic content (the user request, tool results) stays in messages.
+SYSTEM_PROMPT = [{
+    "type": "text",
+    "text": (
+        "You are an assistant with access to a remote calculator tool. "
+        "Use the tool for every arithmetic operation instead of computing results yourself, "
+        "then report the tool's answer briefly."
+    ),
+    "cache_control": {"type": "ephemeral"}
+}]
+
+# You will get this URL by starting mini.py script. See "MCP Server available at:<URL>"
+MCP_SERVER_URL = "https://a2d7-193-166-15-251.ngrok-free.app/sse"  # Replace with your ngrok URL from mini.py
+
+PROMPTS = [
+    "Use the calculate tool to multiply 50 * 3",
+]
+
+async def call_llm(prompt: str):
     # First, ensure mini.py is running in another terminal with:
     # python mini.py
     # This will start the server and give you a URL to use
-    # You will get this URL by starting mini.py script. See "MCP Server available at:<URL>"
-    
-    response = client.beta.messages.create(
+    return await client.beta.messages.create(
         model="claude-3-7-sonnet-latest",
         max_tokens=1000,
+        system=SYSTEM_PROMPT,
         messages=[{
             "role": "user",
-            "content": "Use the calculate tool to multiply 50 * 3"
+            "content": prompt
         }],
         mcp_servers=[{
             "type": "url",
-            "url": "https://a2d7-193-166-15-251.ngrok-free.app/sse",  # Replace with your ngrok URL from mini.py
+            "url": MCP_SERVER_URL,
             "name": "calc"
         }],
         betas=["mcp-client-2025-04-04"]
     )
 
-    print(response.content)
+async def main() -> None:
+    try:
+        # Independent prompts are sent concurrently
+        responses = await asyncio.gather(*(call_llm(prompt) for prompt in PROMPTS))
+        for response in responses:
+            print(response.content)
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
-    call_llm()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass, field
 
 from pydantic_graph import BaseNode, End, Graph, GraphRunContext
@@ -14,6 +15,8 @@ class ConversationState:
     messages: list[str] = field(default_factory=list)
 
 # AI agent for generating questions
+# The instructions stay in the static system prompt; only the topic varies
+# and is sent last, keeping the prompt prefix identical across calls.
 question_agent = Agent(
     'openai:gpt-4o',
     system_prompt='Generate engaging questions about the given topic.'
@@ -23,18 +26,24 @@ question_agent = Agent(
 @dataclass
 class AskQuestion(BaseNode[ConversationState]):
     async def run(self, ctx: GraphRunContext[ConversationState]) -> ReceiveAnswer:
-        result = await question_agent.run(f"Ask a question about {ctx.state.topic}")
+        result = await question_agent.run(f"Topic: {ctx.state.topic}")
         question = result.data
         ctx.state.messages.append(f"Q: {question}")
-        print(f"Question: {question}")
+        print(f"[{ctx.state.topic}] Question: {question}")
         return ReceiveAnswer()
 
+# Conversations on different topics run concurrently but share one terminal,
+# so only one of them reads an answer at a time
+input_lock = asyncio.Lock()
+
 # Second node - simulates receiving an answer
 @dataclass
 class ReceiveAnswer(BaseNode[ConversationState, None, str]):
     async def run(self, ctx: GraphRunContext[ConversationState]) -> EvaluateAnswer | End[str]:
-        # In a real app, you'd get this from user input
-        answer = input("Your answer: ")
+        # In a real app, you'd get this from user input. Read it in a thread
+        # so other conversations keep generating questions meanwhile.
+        async with input_lock:
+            answer = await asyncio.to_thread(input, f"[{ctx.state.topic}] Your answer: ")
         ctx.state.messages.append(f"A: {answer}")
         
         if answer.lower() == "exit":
@@ -51,17 +60,20 @@ class EvaluateAnswer(BaseNode[ConversationState, None, str]):
             return End("Conversation complete!")
         return AskQuestion()
 
-# Create and run the conversation graph
+# Create and run the conversation graph, one independent run per topic
 async def main():
-    state = ConversationState(topic="artificial intelligence")
+    topics = ["artificial intelligence", "space exploration"]
+    states = [ConversationState(topic=topic) for topic in topics]
     conversation_graph = Graph(nodes=[AskQuestion, ReceiveAnswer, EvaluateAnswer])
-    result = await conversation_graph.run(AskQuestion(), state=state)
+    results = await asyncio.gather(
+        *(conversation_graph.run(AskQuestion(), state=state) for state in states)
+    )
     
-    print("\nConversation summary:")
-    for message in state.messages:
-        print(message)
-    print(f"\nResult: {result.output}")
+    for state, result in zip(states, results):
+        print(f"\nConversation summary ({state.topic}):")
+        for message in state.messages:
+            print(message)
+        print(f"\nResult: {result.output}")
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
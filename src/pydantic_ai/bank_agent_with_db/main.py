@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import os
 from dataclasses import dataclass
 
@@ -8,27 +9,47 @@ from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
 
 
+@functools.cache
+def _default_connection_string():
+    """Get connection details from environment variables or use defaults.
+    
+    The environment is read once per process and the URL reused afterwards.
+    """
+    host = os.getenv("DB_HOST", "localhost")
+    port = os.getenv("DB_PORT", "5432")
+    user = os.getenv("DB_USER", "postgres")
+    password = os.getenv("DB_PASSWORD", "postgres")
+    database = os.getenv("DB_NAME", "bankdb")
+    
+    return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+
+
 class PostgresConn:
     """PostgreSQL database connection for banking application."""
     
     def __init__(self, connection_string=None):
         self.pool = None
-        self.connection_string = connection_string or self._get_default_connection_string()
-        
-    def _get_default_connection_string(self):
-        """Get connection details from environment variables or use defaults."""
-        host = os.getenv("DB_HOST", "localhost")
-        port = os.getenv("DB_PORT", "5432")
-        user = os.getenv("DB_USER", "postgres")
-        password = os.getenv("DB_PASSWORD", "postgres")
-        database = os.getenv("DB_NAME", "bankdb")
-        
-        return f"postgresql://{user}:{password}@{host}:{port}/{database}"
+        self.connection_string = connection_string or _default_connection_string()
         
     async def connect(self):
         """Connect to the database."""
         if not self.pool:
-            self.pool = await asyncpg.create_pool(self.connection_string)
+            # Pool size follows the (cores * 2) + 1 rule of thumb unless overridden,
+            # with room for at least the concurrent agent runs in main().
+            min_size = int(os.getenv("DB_POOL_MIN", "2"))
+            max_size = int(os.getenv("DB_POOL_MAX", str(max(4, (os.cpu_count() or 1) * 2 + 1))))
+            self.pool = await asyncpg.create_pool(
+                self.connection_string,
+                min_size=min(min_size, max_size),
+                max_size=max_size,
+                max_inactive_connection_lifetime=300,
+                command_timeout=10,
+                # asyncpg prepares every query server-side and keeps it in a
+                # per-connection LRU cache; keep the handful of queries used by
+                # the tools cached for the lifetime of the connection.
+                statement_cache_size=1024,
+                max_cached_statement_lifetime=0,
+            )
             print("Connected to database pool")
         
     async def close(self):
@@ -43,75 +64,47 @@ class PostgresConn:
         if not self.pool:
             await self.connect()
             
-        async with self.pool.acquire() as conn:
-            query = "SELECT name FROM customers WHERE id = $1"
-            result = await conn.fetchval(query, id)
-            return result
+        query = "SELECT name FROM customers WHERE id = $1"
+        return await self.pool.fetchval(query, id)
     
     async def customer_balance(self, *, id: int, include_pending: bool) -> float:
         """Get customer's total balance from database."""
         if not self.pool:
             await self.connect()
         
-        async with self.pool.acquire() as conn:
-            print(f"Checking balance for customer ID {id}")
-            
-            # Get all customer accounts
-            accounts_query = "SELECT id FROM accounts WHERE customer_id = $1"
-            account_ids = await conn.fetch(accounts_query, id)
-            
-            if not account_ids:
-                raise ValueError('Customer not found or has no accounts')
-            
-            total_balance = 0.0
-            
-            # Process all customer accounts
-            for record in account_ids:
-                account_id = record['id']
-                
-                # Get base account balance
-                balance_query = "SELECT balance FROM accounts WHERE id = $1"
-                base_balance = await conn.fetchval(balance_query, account_id)
-                
-                # Convert Decimal to float
-                if base_balance is not None:
-                    base_balance = float(base_balance)
-                else:
-                    base_balance = 0.0
-                
-                # Add transactions based on status
-                if include_pending:
-                    # Include both confirmed and pending transactions
-                    transactions_query = """
-                        SELECT COALESCE(SUM(amount), 0.0) FROM transactions 
-                        WHERE account_id = $1 AND status IN ('confirmed', 'pending')
-                    """
-                else:
-                    # Only confirmed transactions
-                    transactions_query = """
-                        SELECT COALESCE(SUM(amount), 0.0) FROM transactions 
-                        WHERE account_id = $1 AND status = 'confirmed'
-                    """
-                    
-                transactions_sum = await conn.fetchval(transactions_query, account_id)
-                
-                # Convert Decimal to float
-                if transactions_sum is not None:
-                    transactions_sum = float(transactions_sum)
-                else:
-                    transactions_sum = 0.0
-                
-                # Add to total balance
-                total_balance += base_balance + transactions_sum
-                
-            return total_balance
-    
+        print(f"Checking balance for customer ID {id}")
+        
+        # Sum account balances and their transactions in a single round trip.
+        # The lateral subquery aggregates transactions per account so that
+        # an account balance is never counted once per transaction row.
+        balance_query = """
+            SELECT SUM(COALESCE(a.balance, 0) + t.total)
+            FROM accounts a
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(SUM(amount), 0) AS total
+                FROM transactions
+                WHERE account_id = a.id
+                AND (status = 'confirmed' OR ($2 AND status = 'pending'))
+            ) t
+            WHERE a.customer_id = $1
+        """
+        total_balance = await self.pool.fetchval(balance_query, id, include_pending)
+        
+        # SUM over no rows yields NULL, i.e. the customer has no accounts
+        if total_balance is None:
+            raise ValueError('Customer not found or has no accounts')
+        
+        # Convert Decimal to float
+        return float(total_balance)
+
     async def block_card(self, *, customer_id: int) -> bool:
         """Block customer's cards."""
         if not self.pool:
             await self.connect()
             
-        async with self.pool.acquire() as conn:
+        # Both statements run on one connection inside a transaction so the
+        # account lookup and the update see a consistent view.
+        async with self.pool.acquire() as conn, conn.transaction():
             print(f"Blocking cards for customer ID {customer_id}")
             
             # First find all account IDs for this customer
@@ -132,16 +125,37 @@ class PostgresConn:
                 AND status = 'active'
             """
             
-            result = await conn.execute(update_query, account_id_list)
+            # The command tag has the form "UPDATE <row count>"
+            tag = await conn.execute(update_query, account_id_list)
             
             # Returns True if at least one card was blocked
-            return "UPDATE" in result
+            return int(tag.rsplit(' ', 1)[-1]) > 0
+    
+    async def block_cards_bulk(self, customer_ids: list[int]) -> int:
+        """Block the active cards of several customers in one statement.
+        
+        Returns the number of cards blocked.
+        """
+        if not self.pool:
+            await self.connect()
+            
+        update_query = """
+            UPDATE cards 
+            SET status = 'blocked' 
+            WHERE status = 'active'
+            AND account_id IN (
+                SELECT id FROM accounts WHERE customer_id = ANY($1::int[])
+            )
+        """
+        tag = await self.pool.execute(update_query, customer_ids)
+        return int(tag.rsplit(' ', 1)[-1])
 
 
 @dataclass
 class SupportDependencies:
     customer_id: int
     db: PostgresConn
+    name: str | None = None
 
 
 class SupportResult(BaseModel):
@@ -154,6 +168,9 @@ support_agent = Agent(
     'openai:gpt-4o',
     deps_type=SupportDependencies,
     result_type=SupportResult,
+    # The static prompt never changes between runs, so the provider can serve
+    # it from its prompt cache. Per-customer details are appended after it by
+    # the dynamic system prompt below.
     system_prompt=(
         'You are a bank customer support agent. Provide support to the customer '
         'and assess the risk level of their query. Use the customer\'s name in your response.'
@@ -162,18 +179,19 @@ support_agent = Agent(
 
 
 @support_agent.system_prompt
-async def add_customer_name(ctx: RunContext[SupportDependencies]) -> str:
-    """Add customer name to system prompt."""
-    customer_name = await ctx.deps.db.customer_name(id=ctx.deps.customer_id)
-    return f"The customer's name is {customer_name!r}"
+def add_customer_name(ctx: RunContext[SupportDependencies]) -> str:
+    """Add customer name to the end of the system prompt."""
+    return f"The customer's name is {ctx.deps.name!r}"
 
 
 @support_agent.tool
 async def customer_balance(
     ctx: RunContext[SupportDependencies], include_pending: bool
 ) -> str:
-    print(f"Checking balance for customer ID {ctx.deps.customer_id}")
     """Returns the customer's current account balance."""
+    # The balance is only ever returned as a tool result. Keeping it out of
+    # the system prompt leaves the prompt prefix identical across runs.
+    print(f"Checking balance for customer ID {ctx.deps.customer_id}")
     try:
         balance = await ctx.deps.db.customer_balance(
             id=ctx.deps.customer_id,
@@ -206,17 +224,28 @@ async def main():
         # Connect to database
         await db.connect()
         
+        # Fetch customer details once up front instead of on every run
+        customer_id = 123
+        name = await db.customer_name(id=customer_id)
+        
         # Create dependencies
-        deps = SupportDependencies(customer_id=123, db=db)
+        deps = SupportDependencies(
+            customer_id=customer_id,
+            db=db,
+            name=name,
+        )
+        
+        # Run the independent queries concurrently
+        balance_result, card_result = await asyncio.gather(
+            support_agent.run('How much money do I have?', deps=deps),
+            support_agent.run('I lost my card!', deps=deps),
+        )
         
-        # Run agent
         print("\n=== Query 1: Balance Inquiry ===")
-        result = await support_agent.run('How much money do I have?', deps=deps)
-        print(result.data)
+        print(balance_result.data)
         
         print("\n=== Query 2: Lost Card ===")
-        result = await support_agent.run('I lost my card!', deps=deps)
-        print(result.data)
+        print(card_result.data)
         
     finally:
         # Close database connection
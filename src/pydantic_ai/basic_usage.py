@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 
 from pydantic_ai import Agent
+from response_cache import cached_run_sync
 
 
 # Define a structured output model
@@ -11,6 +12,6 @@ class CityLocation(BaseModel):
 # Create an agent with structured output
 agent = Agent('openai:gpt-4o', result_type=CityLocation)
 
-# Run the agent
-result = agent.run_sync('Where were the olympics held in 2012?')
-print(result.data)  # city='London' country='United Kingdom'
\ No newline at end of file
+# Run the agent, reusing the stored answer on repeated runs
+result = cached_run_sync(agent, 'Where were the olympics held in 2012?')
+print(result)  # city='London' country='United Kingdom'
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""On-disk cache for agent results.
+
+Results are stored as JSON under `.cache/<hash>.json`, keyed on everything
+that determines the model response: provider, model, the agent's system
+prompts, the result schema, user prompt and a fingerprint of the
+dependencies. Only use it for agents whose answers are pure functions of
+those inputs - agents with side-effecting tools (blocking cards, live API
+lookups) must not be cached.
+"""
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+from pydantic_ai import Agent
+
+CACHE_DIR = Path(".cache")
+
+T = TypeVar("T")
+
+
+def _cache_key(*parts: str) -> str:
+    """Hash the parts, length-prefixing each so field boundaries can't collide."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode()
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _model_name(agent: Agent) -> str:
+    """The agent's model as `provider:model`, or as given when it is a string."""
+    model = agent.model
+    if model is None:
+        return ""
+    return model if isinstance(model, str) else f"{model.system}:{model.model_name}"
+
+
+def _system_prompts(agent: Agent) -> str:
+    """The agent's static system prompts and the names of its prompt functions.
+
+    What the prompt functions return depends on the dependencies, which are
+    part of the key separately.
+    """
+    functions = [runner.function.__qualname__ for runner in agent._system_prompt_functions]
+    return json.dumps([list(agent._system_prompts), functions])
+
+
+async def cached_run(
+    agent: Agent[Any, T],
+    prompt: str,
+    *,
+    deps: Any = None,
+    result_type: type[T] | None = None,
+) -> T:
+    """Run the agent, or return the stored result of an identical earlier run.
+
+    `result_type` defaults to the agent's own and is passed on to the run. `deps` is fingerprinted by its
+    `repr`, so it must be stable across runs.
+    """
+    adapter = TypeAdapter(result_type or agent.result_type)
+    key = _cache_key(
+        _model_name(agent),
+        _system_prompts(agent),
+        json.dumps(adapter.json_schema(), sort_keys=True),
+        prompt,
+        repr(deps),
+    )
+    path = CACHE_DIR / f"{key}.json"
+
+    if path.exists():
+        try:
+            return adapter.validate_json(path.read_bytes())
+        except ValidationError:
+            # Stored by an older version of the result model; run again
+            pass
+
+    result = await agent.run(prompt, result_type=result_type, deps=deps)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(adapter.dump_json(result.data))
+    return result.data
+
+
+def cached_run_sync(agent: Agent[Any, T], prompt: str, **kwargs: Any) -> T:
+    """Synchronous wrapper around `cached_run`."""
+    return asyncio.run(cached_run(agent, prompt, **kwargs))
@@ -13,6 +13,8 @@ load_dotenv()
 
 # Note: You need weatherapi.com API key to run this example. Set it to .env file as WEATHERAPI_KEY
 
+WEATHER_API_URL = "https://api.weatherapi.com/v1/current.json"
+
 # 1. Define your dependencies structure
 @dataclass
 class WeatherDeps:
@@ -21,9 +23,8 @@ class WeatherDeps:
     
     # Helper method to fetch weather data
     async def get_weather(self, city: str) -> dict:
-        url = f"https://api.weatherapi.com/v1/current.json"
         params = {"key": self.api_key, "q": city}
-        response = await self.http_client.get(url, params=params)
+        response = await self.http_client.get(WEATHER_API_URL, params=params)
         response.raise_for_status()
         return response.json()
 
@@ -54,8 +55,12 @@ async def fetch_weather(ctx: RunContext[WeatherDeps], city: str) -> str:
 
 # 4. Use the agent with properly initialized dependencies
 async def main():
-    # Create HTTP client
-    async with httpx.AsyncClient() as client:
+    # Create HTTP client that keeps connections alive and multiplexes requests over HTTP/2
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=httpx.Timeout(5.0, connect=2.0),
+    ) as client:
         # Get the API key from the environment variable
         api_key = os.getenv("WEATHERAPI_KEY")  # Replace "WEATHERAPI_KEY" with the actual name of your environment variable
 
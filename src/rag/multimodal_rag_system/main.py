@@ -7,15 +7,23 @@ using IBM's Docling and Granite models to process and analyze PDF documents.
 
 import argparse
 import base64
+import concurrent.futures
+import functools
+import hashlib
 import io
 import itertools
 import logging
+import multiprocessing
 import os
+import sqlite3
 import sys
+import uuid
 from typing import Dict, List
 
+import numpy as np
 import PIL.Image
 import PIL.ImageOps
+import torch
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.document_converter import DocumentConverter, PdfFormatOption
@@ -54,18 +62,132 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
-def encode_image(image: PIL.Image.Image, format: str = "png") -> str:
-    """Encode an image to a base64 data URI."""
+# Chunks per Chroma insert; stays below Chroma's maximum batch size
+CHROMA_INSERT_BATCH_SIZE = 5000
+
+# Concurrent requests to the remote vision model
+VISION_MAX_WORKERS = 16
+
+# Pictures smaller than this are logos, icons and separators, not content
+MIN_IMAGE_AREA = 64 * 64
+MIN_IMAGE_SIDE = 32
+
+# Pictures whose channels all vary less than this are solid swatches
+UNIFORM_IMAGE_RANGE = 8
+
+# Pictures whose hashes differ in at most this many bits are treated as repeats
+DUPLICATE_IMAGE_DISTANCE = 4
+
+# Recent answers kept on disk for reuse across runs, and how similar a new
+# question must be to an earlier one (cosine of their embeddings) to reuse
+# its answer
+ANSWER_CACHE_SIZE = 512
+ANSWER_CACHE_THRESHOLD = 0.95
+
+
+def encode_image(image: PIL.Image.Image, format: str = "jpeg", quality: int = 85) -> str:
+    """Encode an image to a base64 data URI.
+
+    JPEG keeps vision-model uploads several times smaller than PNG for the
+    photos and diagrams Docling extracts from PDFs.
+    """
     image = PIL.ImageOps.exif_transpose(image) or image
-    image = image.convert("RGB")
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
 
     buffer = io.BytesIO()
-    image.save(buffer, format)
-    encoding = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    image.save(buffer, format, quality=quality)
+    encoding = base64.b64encode(buffer.getbuffer()).decode("ascii")
     uri = f"data:image/{format};base64,{encoding}"
     return uri
 
 
+def is_decorative_image(image: PIL.Image.Image) -> bool:
+    """Return True for tiny or near-uniform pictures not worth describing."""
+    width, height = image.size
+    if width * height < MIN_IMAGE_AREA or min(width, height) < MIN_IMAGE_SIDE:
+        return True
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return all(high - low < UNIFORM_IMAGE_RANGE for low, high in image.getextrema())
+
+
+def image_hash(image: PIL.Image.Image) -> int:
+    """Compute a 64-bit difference hash; visually similar images get close hashes."""
+    pixels = np.asarray(image.convert("L").resize((9, 8), PIL.Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def create_document_converter() -> DocumentConverter:
+    """Create a Docling converter for PDFs with picture extraction enabled."""
+    pdf_pipeline_options = PdfPipelineOptions(
+        do_ocr=False,
+        generate_picture_images=True,
+    )
+    format_options = {
+        InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_pipeline_options),
+    }
+    return DocumentConverter(format_options=format_options)
+
+
+@functools.lru_cache(maxsize=1)
+def _worker_document_converter() -> DocumentConverter:
+    """Converter owned by a worker process, built on its first task."""
+    return create_document_converter()
+
+
+def _convert_one(source: str):
+    """Convert a single source in a worker process."""
+    return _worker_document_converter().convert(source=source).document
+
+
+class CachedHuggingFaceEmbeddings(HuggingFaceEmbeddings):
+    """HuggingFace embeddings that store document vectors in SQLite.
+
+    Vectors are keyed by the model name and a hash of the chunk text, so
+    re-ingesting unchanged documents reads them from disk instead of
+    running the model again.
+    """
+
+    cache_path: str = "embeddings_cache.sqlite"
+
+    def _cache_key(self, text: str) -> bytes:
+        return hashlib.sha256((self.model_name + "\x1f" + text).encode()).digest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._cache_key(text) for text in texts]
+
+        with sqlite3.connect(self.cache_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings_cache (key BLOB PRIMARY KEY, vec BLOB)"
+            )
+            cached = {}
+            # Look keys up in slices to stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vec FROM embeddings_cache WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                cached.update((key, np.frombuffer(vec, dtype=np.float32).tolist()) for key, vec in rows)
+
+            # Only embed the chunks that aren't cached yet, in one batched call
+            misses = [i for i, key in enumerate(keys) if key not in cached]
+            if misses:
+                vectors = super().embed_documents([texts[i] for i in misses])
+                rows = []
+                for i, vector in zip(misses, vectors):
+                    cached[keys[i]] = vector
+                    rows.append((keys[i], np.asarray(vector, dtype=np.float32).tobytes()))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings_cache (key, vec) VALUES (?, ?)", rows
+                )
+
+        return [cached[key] for key in keys]
+
+
 class MultimodalRAGSystem:
     """A multimodal RAG system using IBM's Docling and Granite models."""
 
@@ -82,17 +204,33 @@ class MultimodalRAGSystem:
         self.rag_chain = None
         self.force_reprocess = force_reprocess
         self.db_dir = os.path.join(os.getcwd(), "database")
+        self.answer_cache_path = os.path.join(self.db_dir, "answer_cache.sqlite")
         
     def initialize_models(self):
         """Initialize all AI models needed for the RAG system."""
         self.logger.info("Initializing AI models...")
         
         # Initialize embeddings model
+        # On GPU the model runs in fp16; unit-length output makes cosine
+        # distance a plain dot product in the vector store
         embeddings_model_path = "ibm-granite/granite-embedding-30m-english"
-        self.embeddings_model = HuggingFaceEmbeddings(
+        if torch.cuda.is_available():
+            model_kwargs = {"device": "cuda", "model_kwargs": {"torch_dtype": torch.float16}}
+        else:
+            model_kwargs = {"device": "cpu"}
+        self.embeddings_model = CachedHuggingFaceEmbeddings(
             model_name=embeddings_model_path,
+            cache_path=os.path.join(self.db_dir, "embeddings_cache.sqlite"),
+            model_kwargs=model_kwargs,
+            encode_kwargs={"batch_size": 64, "normalize_embeddings": True},
         )
-        self.embeddings_tokenizer = AutoTokenizer.from_pretrained(embeddings_model_path)
+        # sentence-transformers has already loaded the tokenizer; reuse it.
+        # langchain-huggingface keeps the model in `_client` (`client` in
+        # older releases).
+        client = getattr(self.embeddings_model, "_client", None) or getattr(self.embeddings_model, "client", None)
+        self.embeddings_tokenizer = getattr(client, "tokenizer", None)
+        if self.embeddings_tokenizer is None:
+            self.embeddings_tokenizer = AutoTokenizer.from_pretrained(embeddings_model_path)
         
         # Initialize vision model
         vision_model_path = "ibm-granite/granite-vision-3.2-2b"
@@ -124,14 +262,7 @@ class MultimodalRAGSystem:
         """Initialize the Docling document converter."""
         self.logger.info("Initializing document converter...")
         
-        pdf_pipeline_options = PdfPipelineOptions(
-            do_ocr=False,
-            generate_picture_images=True,
-        )
-        format_options = {
-            InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_pipeline_options),
-        }
-        self.document_converter = DocumentConverter(format_options=format_options)
+        self.document_converter = create_document_converter()
         
         self.logger.info("Document converter initialized successfully")
 
@@ -146,12 +277,14 @@ class MultimodalRAGSystem:
         # Initialize the ChromaDB vector store
         self.vector_db = Chroma(
             embedding_function=self.embeddings_model,
-            persist_directory=self.db_dir
+            persist_directory=self.db_dir,
+            collection_metadata={"hnsw:space": "cosine"}
         )
         
         # Check if the database already has documents
         try:
-            collection_size = len(self.vector_db.get()["ids"])
+            # count() is a COUNT(*) in Chroma; get() would load every record
+            collection_size = self.vector_db._collection.count()
             self.logger.info(f"Found existing database with {collection_size} documents")
             # If we're not forcing reprocessing and there are documents, we can skip the document processing
             if collection_size > 0 and not self.force_reprocess:
@@ -175,79 +308,94 @@ class MultimodalRAGSystem:
         """Process documents from the provided sources."""
         self.logger.info(f"Processing documents from {len(sources)} sources...")
         
-        # Convert documents using Docling
-        conversions = {
-            source: self.document_converter.convert(source=source).document
-            for source in sources
-        }
+        # Convert documents using Docling. Conversion is CPU-bound, so several
+        # sources are converted in parallel worker processes. The workers are
+        # spawned rather than forked: by now torch and the models are loaded,
+        # and a forked child cannot re-initialise CUDA (or may hang in OpenMP).
+        if len(sources) <= 1:
+            conversions = {
+                source: self.document_converter.convert(source=source).document
+                for source in sources
+            }
+        else:
+            max_workers = min(len(sources), os.cpu_count() or 1)
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = {source: executor.submit(_convert_one, source) for source in sources}
+                conversions = {source: future.result() for source, future in futures.items()}
         
         self.logger.info("Documents converted successfully")
         return conversions
 
-    def extract_text_chunks(self, conversions: Dict[str, Dict]) -> List[Document]:
-        """Extract and chunk text content from the converted documents."""
-        self.logger.info("Extracting text chunks...")
+    def _iter_document_elements(self, conversions: Dict[str, Dict]):
+        """Yield ("text" | "table" | "picture", source, element) for each document.
+
+        The chunker is built once per run and every document is visited once.
+        """
+        chunker = HybridChunker(tokenizer=self.embeddings_tokenizer)
+        
+        for source, docling_document in conversions.items():
+            for chunk in chunker.chunk(docling_document):
+                yield "text", source, chunk
+            for table in docling_document.tables:
+                yield "table", source, table
+            for picture in docling_document.pictures:
+                yield "picture", source, picture
+
+    def extract_documents(self, conversions: Dict[str, Dict]) -> List[Document]:
+        """Extract text chunks, tables and image descriptions from the converted documents."""
+        self.logger.info("Extracting text chunks, tables and images...")
         
         doc_id = 0
         texts = []
+        tables = []
+        picture_items = []
         
-        for source, docling_document in conversions.items():
-            for chunk in HybridChunker(tokenizer=self.embeddings_tokenizer).chunk(docling_document):
-                items = chunk.meta.doc_items
+        for kind, source, element in self._iter_document_elements(conversions):
+            if kind == "text":
+                items = element.meta.doc_items
                 if len(items) == 1 and isinstance(items[0], TableItem):
                     continue  # Process tables separately
                     
-                refs = " ".join(map(lambda item: item.get_ref().cref, items))
-                text = chunk.text
-                
-                document = Document(
-                    page_content=text,
+                # self_ref is the same string get_ref().cref would wrap in a new RefItem
+                refs = " ".join(item.self_ref for item in items)
+                doc_id += 1
+                texts.append(Document(
+                    page_content=element.text,
                     metadata={
-                        "doc_id": doc_id + 1,
+                        "doc_id": doc_id,
                         "source": source,
                         "ref": refs,
                     },
-                )
-                texts.append(document)
-                doc_id += 1
-        
-        self.logger.info(f"{len(texts)} text document chunks created")
-        return texts
-
-    def extract_tables(self, conversions: Dict[str, Dict], start_doc_id: int) -> List[Document]:
-        """Extract tables from the converted documents."""
-        self.logger.info("Extracting tables...")
-        
-        doc_id = start_doc_id
-        tables = []
-        
-        for source, docling_document in conversions.items():
-            for table in docling_document.tables:
-                if table.label in [DocItemLabel.TABLE]:
-                    ref = table.get_ref().cref
-                    text = table.export_to_markdown()
-                    
-                    document = Document(
-                        page_content=text,
+                ))
+            elif kind == "table":
+                if element.label in [DocItemLabel.TABLE]:
+                    doc_id += 1
+                    tables.append(Document(
+                        page_content=element.export_to_markdown(),
                         metadata={
-                            "doc_id": doc_id + 1,
+                            "doc_id": doc_id,
                             "source": source,
-                            "ref": ref,
+                            "ref": element.self_ref,
                         },
-                    )
-                    tables.append(document)
+                    ))
+            elif kind == "picture":
+                image = element.get_image(conversions[source])
+                if image:
                     doc_id += 1
+                    picture_items.append((doc_id, source, element.self_ref, image))
         
+        self.logger.info(f"{len(texts)} text document chunks created")
         self.logger.info(f"{len(tables)} table documents created")
-        return tables
+        
+        pictures = self.process_images(picture_items)
+        return list(itertools.chain(texts, tables, pictures))
 
-    def process_images(self, conversions: Dict[str, Dict], start_doc_id: int) -> List[Document]:
-        """Process images from the converted documents using the vision model."""
+    def process_images(self, picture_items: List[tuple]) -> List[Document]:
+        """Describe (doc_id, source, ref, image) items using the vision model."""
         self.logger.info("Processing images...")
         
-        doc_id = start_doc_id
-        pictures = []
-        
         # Prepare vision model prompt
         image_prompt = "If the image contains text, explain the text in the image."
         conversation = [
@@ -264,25 +412,40 @@ class MultimodalRAGSystem:
             add_generation_prompt=True,
         )
         
-        for source, docling_document in conversions.items():
-            for picture in docling_document.pictures:
-                ref = picture.get_ref().cref
-                self.logger.info(f"Processing image: {ref}")
-                
-                image = picture.get_image(docling_document)
-                if image:
-                    text = self.vision_model.invoke(vision_prompt, image=encode_image(image))
-                    
-                    document = Document(
-                        page_content=text,
-                        metadata={
-                            "doc_id": doc_id + 1,
-                            "source": source,
-                            "ref": ref,
-                        },
-                    )
-                    pictures.append(document)
-                    doc_id += 1
+        # Each description is an independent remote call, so run them concurrently
+        def describe(item):
+            _, _, ref, image = item
+            self.logger.info(f"Processing image: {ref}")
+            return self.vision_model.invoke(vision_prompt, image=encode_image(image))
+        
+        # Skip logos, separators and pictures repeated on every page before
+        # they reach the vision model
+        items = []
+        seen_hashes = []
+        for item in picture_items:
+            image = item[3]
+            if is_decorative_image(image):
+                continue
+            digest = image_hash(image)
+            if any((digest ^ seen).bit_count() <= DUPLICATE_IMAGE_DISTANCE for seen in seen_hashes):
+                continue
+            seen_hashes.append(digest)
+            items.append(item)
+        self.logger.info(f"Describing {len(items)} of {len(picture_items)} images")
+        
+        pictures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=VISION_MAX_WORKERS) as executor:
+            # map() yields results in input order, matching each item to its text
+            for (doc_id, source, ref, _), text in zip(items, executor.map(describe, items)):
+                document = Document(
+                    page_content=text,
+                    metadata={
+                        "doc_id": doc_id,
+                        "source": source,
+                        "ref": ref,
+                    },
+                )
+                pictures.append(document)
         
         self.logger.info(f"{len(pictures)} image descriptions created")
         return pictures
@@ -290,11 +453,28 @@ class MultimodalRAGSystem:
     def populate_vector_db(self, documents: List[Document]):
         """Add documents to the vector database."""
         self.logger.info("Adding documents to vector database...")
-        self.vector_db.add_documents(documents)
-        # Persist the database to disk
-        if hasattr(self.vector_db, "_persist"):
-            self.vector_db._persist()
+        
+        # Embed every chunk up front so the model runs in batches of 64,
+        # then insert into Chroma in large slices rather than per document
+        texts = [document.page_content for document in documents]
+        metadatas = [document.metadata for document in documents]
+        ids = [str(uuid.uuid4()) for _ in documents]
+        vectors = self.embeddings_model.embed_documents(texts)
+        
+        for start in range(0, len(texts), CHROMA_INSERT_BATCH_SIZE):
+            end = start + CHROMA_INSERT_BATCH_SIZE
+            self.vector_db._collection.add(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                documents=texts[start:end],
+                metadatas=metadatas[start:end],
+            )
+        # Chroma's persistent client writes to disk on its own; no explicit flush needed
         self.logger.info(f"{len(documents)} documents added to the vector database")
+        
+        # Answers cached against the previous documents are stale now
+        with sqlite3.connect(self.answer_cache_path) as conn:
+            conn.execute("DROP TABLE IF EXISTS answer_cache")
 
     def create_rag_pipeline(self):
         """Create the RAG pipeline using LangChain and Granite models."""
@@ -346,8 +526,35 @@ Document {doc_id}
     def answer_query(self, query: str) -> str:
         """Answer a query using the RAG pipeline."""
         self.logger.info(f"Answering query: {query}")
+        
+        # Embeddings are unit length, so a dot product is the cosine similarity
+        vector = np.asarray(self.embeddings_model.embed_query(query), dtype=np.float32)
+        with sqlite3.connect(self.answer_cache_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_cache "
+                "(id INTEGER PRIMARY KEY AUTOINCREMENT, vec BLOB, answer TEXT)"
+            )
+            rows = conn.execute(
+                "SELECT vec, answer FROM answer_cache ORDER BY id DESC LIMIT ?", (ANSWER_CACHE_SIZE,)
+            ).fetchall()
+        if rows:
+            vectors = np.frombuffer(b"".join(vec for vec, _ in rows), dtype=np.float32)
+            similarities = vectors.reshape(len(rows), -1) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= ANSWER_CACHE_THRESHOLD:
+                self.logger.info("Reusing the answer to a similar earlier query")
+                return rows[best][1]
+        
         outputs = self.rag_chain.invoke({"input": query})
-        return outputs["answer"]
+        answer = outputs["answer"]
+        
+        # Remember the answer, evicting the oldest once the cache is full
+        with sqlite3.connect(self.answer_cache_path) as conn:
+            cursor = conn.execute(
+                "INSERT INTO answer_cache (vec, answer) VALUES (?, ?)", (vector.tobytes(), answer)
+            )
+            conn.execute("DELETE FROM answer_cache WHERE id <= ?", (cursor.lastrowid - ANSWER_CACHE_SIZE,))
+        return answer
 
     def run(self, sources: List[str], query: str):
         """Run the complete RAG pipeline."""
@@ -363,13 +570,8 @@ Document {doc_id}
             # Process documents
             conversions = self.process_documents(sources)
             
-            # Extract content
-            text_chunks = self.extract_text_chunks(conversions)
-            tables = self.extract_tables(conversions, len(text_chunks))
-            pictures = self.process_images(conversions, len(text_chunks) + len(tables))
-            
-            # Combine all documents
-            all_documents = list(itertools.chain(text_chunks, tables, pictures))
+            # Extract text chunks, tables and image descriptions in one pass
+            all_documents = self.extract_documents(conversions)
             
             # Add to vector database
             self.populate_vector_db(all_documents)
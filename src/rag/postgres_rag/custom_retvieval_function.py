@@ -1,28 +1,142 @@
 import logging
+import time
+from functools import lru_cache
 
+import numpy as np
 import psycopg
+import torch
 from langchain_huggingface import HuggingFaceEmbeddings
+from pgvector.psycopg import register_vector
+from psycopg import sql
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Create and return a database connection with dictionary row factory."""
-    conn = psycopg.connect(
-        "host=localhost port=5433 dbname=vector_db user=postgres password=postgres",
-        row_factory=dict_row
+DB_CONNINFO = "host=localhost port=5433 dbname=vector_db user=postgres password=postgres"
+
+# HNSW search breadth; higher values trade query speed for recall
+HNSW_EF_SEARCH = 100
+
+# Dimension of all-MiniLM-L6-v2 embeddings
+EMBEDDING_DIMENSIONS = 384
+
+# How long a resolved collection is reused before it is looked up again
+COLLECTIONS_TTL_SECONDS = 60
+_collections_cache = {}  # requested name -> (uuid, actual name, expires_at)
+
+def _configure_connection(conn):
+    """Prepare each new pooled connection for vector search."""
+    # Send embeddings as native binary vectors instead of formatted strings
+    register_vector(conn)
+    conn.execute(f"SET hnsw.ef_search = {HNSW_EF_SEARCH}")
+    conn.commit()
+
+@lru_cache(maxsize=1)
+def get_connection_pool():
+    """Create the shared connection pool on first use."""
+    return ConnectionPool(
+        DB_CONNINFO,
+        min_size=2,
+        max_size=10,
+        kwargs={"row_factory": dict_row},
+        configure=_configure_connection,
+        open=True
     )
-    return conn
 
+def resolve_collection(cur, collection_name):
+    """Return (uuid, name) of the collection to search, or None if there are none.
+    
+    Falls back to the first collection when the requested one doesn't exist.
+    The result is cached for COLLECTIONS_TTL_SECONDS, keeping the lookup off
+    the search path.
+    """
+    now = time.monotonic()
+    cached = _collections_cache.get(collection_name)
+    if cached and now < cached[2]:
+        return cached[0], cached[1]
+    
+    cur.execute(
+        "SELECT uuid, name FROM langchain_pg_collection ORDER BY (name = %s) DESC LIMIT 1",
+        (collection_name,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    
+    if row['name'] != collection_name:
+        logger.warning(f"Collection '{collection_name}' not found. Using '{row['name']}' instead.")
+    _collections_cache[collection_name] = (row['uuid'], row['name'], now + COLLECTIONS_TTL_SECONDS)
+    return row['uuid'], row['name']
+
+def half_precision_index_name(collection_id):
+    """Name of the collection's half-precision HNSW index."""
+    return f"idx_lpe_half_hnsw_{collection_id.hex}"
+
+def create_vector_index(conn, collection_name="tech_documents"):
+    """Create the collection's half-precision HNSW index if missing.
+    
+    The index is on the expression embedding::halfvec(384), so it's half the
+    size of a full-precision index without adding a column to the shared
+    embeddings table. It only covers this collection's rows: other
+    collections may store embeddings of a different dimension, which the
+    cast would reject. Search ranks candidates with it and scores them on
+    the fp32 embeddings. The full-precision HNSW index from earlier versions
+    is dropped so inserts only maintain one index.
+    """
+    try:
+        with conn.cursor() as cur:
+            collection = resolve_collection(cur, collection_name)
+        if collection is None:
+            return
+        collection_id, _ = collection
+        conn.execute(sql.SQL("""
+            CREATE INDEX IF NOT EXISTS {index}
+            ON langchain_pg_embedding
+            USING hnsw ((embedding::halfvec({dimensions})) halfvec_cosine_ops)
+            WITH (m = 24, ef_construction = 128)
+            WHERE collection_id = {collection_id}
+        """).format(
+            index=sql.Identifier(half_precision_index_name(collection_id)),
+            dimensions=sql.SQL(str(EMBEDDING_DIMENSIONS)),
+            collection_id=sql.Literal(collection_id),
+        ))
+        conn.execute("DROP INDEX IF EXISTS idx_lpe_embedding_hnsw")
+        conn.commit()
+    except psycopg.Error as e:
+        conn.rollback()
+        logger.warning(f"Could not create the half-precision HNSW index, searches will order by the fp32 embeddings: {e}")
+    finally:
+        # The index may have been created or not; look it up again on the next search
+        has_half_precision_index.cache_clear()
+
+@lru_cache(maxsize=32)
+def has_half_precision_index(collection_id):
+    """Return whether the collection has its half-precision HNSW index."""
+    with get_connection_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM pg_indexes WHERE tablename = 'langchain_pg_embedding' AND indexname = %s",
+            (half_precision_index_name(collection_id),)
+        ).fetchone()
+    return row is not None
+
+@lru_cache(maxsize=1)
 def get_embeddings_model():
-    """Initialize and return the embeddings model."""
+    """Initialize the embeddings model once and return the shared instance."""
     logger.info("Initializing embedding model...")
     return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+        model_name="sentence-transformers/all-MiniLM-L6-v2",
+        model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        encode_kwargs={"normalize_embeddings": True, "batch_size": 64}
     )
 
+@lru_cache(maxsize=1024)
+def embed_query(query_text):
+    """Return the query embedding, skipping the model for repeated queries."""
+    return tuple(get_embeddings_model().embed_query(query_text))
+
 def direct_vector_search(query_text, similarity_threshold=0.7, max_results=5, collection_name="tech_documents"):
     """
     Perform a direct vector search in the database without using a custom function.
@@ -37,67 +151,72 @@ def direct_vector_search(query_text, similarity_threshold=0.7, max_results=5, co
         List of document dictionaries with content, metadata, and similarity scores
     """
     # Get embeddings for the query
-    embeddings_model = get_embeddings_model()
-    query_embedding = embeddings_model.embed_query(query_text)
+    query_embedding = np.array(embed_query(query_text), dtype=np.float32)
     
     try:
-        conn = get_db_connection()
-        logger.info(f"Checking database configuration...")
-        
-        # Check what collections are available
-        with conn.cursor() as cur:
-            cur.execute("SELECT name FROM langchain_pg_collection")
-            collections = [row['name'] for row in cur.fetchall()]
-            logger.info(f"Available collections: {', '.join(collections)}")
-            
-            if not collections:
+        with get_connection_pool().connection() as conn, conn.cursor() as cur:
+            collection = resolve_collection(cur, collection_name)
+            if collection is None:
                 logger.error("No collections found in the database.")
                 logger.error("Please run the simple.py script first to create a collection and add documents.")
                 return []
+            collection_id, collection_name = collection
             
-            if collection_name not in collections:
-                logger.warning(f"Collection '{collection_name}' not found. Using '{collections[0]}' instead.")
-                collection_name = collections[0]
-        
-        # Execute direct vector search
-        logger.info(f"Executing direct vector search: '{query_text}' on collection '{collection_name}'")
-        
-        with conn.cursor() as cur:
-            # For pgvector, we need to pass the vector as a string in the format '[1,2,3]'
-            vector_str = str(query_embedding).replace('\n', '').replace(' ', '')
+            # Execute direct vector search
+            logger.info(f"Executing direct vector search: '{query_text}' on collection '{collection_name}'")
             
-            # This direct SQL achieves the same result as our custom function would
-            sql = """
+            # This direct SQL achieves the same result as our custom function would.
+            # The named embedding placeholder is bound once and reused; ordering
+            # by the same halfvec cast the collection's partial index is built on
+            # lets pgvector use that index, while similarity is still reported
+            # from the fp32 vectors. Without the index (pgvector < 0.7, or
+            # create_vector_index not run yet) results are ordered by the fp32
+            # embeddings instead. The collection id is inlined rather than bound
+            # so the planner can match the partial index predicate, and
+            # filtering on it avoids joining the collection table on every search.
+            if has_half_precision_index(collection_id):
+                order_by = sql.SQL(
+                    f"(e.embedding::halfvec({EMBEDDING_DIMENSIONS})) <=> %(embedding)s::halfvec({EMBEDDING_DIMENSIONS})"
+                )
+            else:
+                order_by = sql.SQL("e.embedding <=> %(embedding)s")
+            query = sql.SQL("""
             SELECT
                 e.id::text as id,
                 e.document as content,
                 e.cmetadata as metadata,
-                1 - (e.embedding <=> %s::vector) as similarity
+                1 - (e.embedding <=> %(embedding)s) as similarity
             FROM
                 langchain_pg_embedding e
-            JOIN
-                langchain_pg_collection c ON e.collection_id = c.uuid
             WHERE
-                c.name = %s
-                AND 1 - (e.embedding <=> %s::vector) > %s
+                e.collection_id = {collection_id}
+                AND 1 - (e.embedding <=> %(embedding)s) > %(threshold)s
             ORDER BY
-                e.embedding <=> %s::vector
-            LIMIT %s
-            """
+                {order_by}
+            LIMIT %(limit)s
+            """).format(collection_id=sql.Literal(collection_id), order_by=order_by)
             
-            cur.execute(sql, (vector_str, collection_name, vector_str, similarity_threshold, vector_str, max_results))
+            # prepare=True makes psycopg reuse a server-side prepared statement
+            cur.execute(query, {
+                "embedding": query_embedding,
+                "threshold": similarity_threshold,
+                "limit": max_results,
+            }, prepare=True)
             results = cur.fetchall()
-        
-        # Close connection
-        conn.close()
-        
-        return results
+            
+            if not results:
+                logger.info(f"No documents in '{collection_name}' above similarity {similarity_threshold}")
+            return results
     except Exception as e:
         logger.error(f"Error executing direct vector search: {e}")
         raise
 
 def main():
     try:
+        # Make sure the ANN index exists before searching
+        with get_connection_pool().connection() as conn:
+            create_vector_index(conn)
+        
         # Test the direct vector search
         query = "How do databases work?"
         logger.info(f"Searching for: '{query}'")
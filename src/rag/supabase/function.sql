@@ -19,7 +19,8 @@ BEGIN
   SELECT
     d.id,
     d.title,
-    d.content,
+    -- Only a preview is returned; fetch full text with get_document(id)
+    left(d.content, 200) as content,
     d.metadata,
     1 - (d.embedding <=> query_embedding) as similarity,
     d.created_at,
@@ -32,4 +33,27 @@ BEGIN
     d.embedding <=> query_embedding
   LIMIT max_results;
 END;
+$$;
+
+CREATE OR REPLACE FUNCTION get_document(document_id INT)
+RETURNS TABLE (
+  id INT,
+  title TEXT,
+  content TEXT,
+  metadata JSONB
+) 
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    d.id,
+    d.title,
+    d.content,
+    d.metadata
+  FROM
+    documents d
+  WHERE
+    d.id = document_id;
+END;
 $$;
\ No newline at end of file
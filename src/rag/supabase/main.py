@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -24,16 +25,23 @@ if not all([SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY]):
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def search_documents(query: str, max_results: int = 5, similarity_threshold: float = 0.2):
-    """Search for documents using vector similarity"""
-    
-    # 1. Get embedding for the query - using new client API
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+@lru_cache(maxsize=4096)
+def embed_text(model: str, text: str) -> tuple[float, ...]:
+    """Get an embedding, reusing the result for repeated (model, text) pairs"""
     embedding_response = openai_client.embeddings.create(
-        model="text-embedding-3-small",
-        input=query
+        model=model,
+        input=text
     )
     # The response structure has changed - it's now a Pydantic model
-    query_embedding = embedding_response.data[0].embedding
+    return tuple(embedding_response.data[0].embedding)
+
+def search_documents(query: str, max_results: int = 5, similarity_threshold: float = 0.2):
+    """Search for documents using vector similarity"""
+    
+    # 1. Get embedding for the query (cached for repeated queries)
+    query_embedding = list(embed_text(EMBEDDING_MODEL, query))
     
     # 2. Use custom function to search for similar documents
     results = supabase.rpc(
@@ -59,6 +67,11 @@ def search_documents(query: str, max_results: int = 5, similarity_threshold: flo
     
     return results.data
 
+def get_document(document_id: int):
+    """Fetch the full content of a single document"""
+    results = supabase.rpc("get_document", {"document_id": document_id}).execute()
+    return results.data[0] if results.data else None
+
 # Example usage
 if __name__ == "__main__":
     # Change this to any query related to Haaga-Helia reporting guidelines
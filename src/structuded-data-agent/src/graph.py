@@ -1,6 +1,9 @@
 """Graph definition for the LangGraph agent."""
 
-from langgraph.checkpoint.memory import MemorySaver
+import os
+import sqlite3
+
+from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import END, StateGraph
 
 from src.nodes import (generate_structured_data, get_human_feedback,
@@ -26,17 +29,11 @@ def route_based_on_feedback(state: State):
     Returns:
         str: Name of the next node
     """
-    # Check if "is_satisfied" is present in the state
-    if "is_satisfied" not in state:
-        return "generate_structured_data"
-
-    # Route based on satisfaction flag
-    if state["is_satisfied"] is True:
-        # If user is satisfied, proceed to processing
+    # Proceed to processing only if the user is satisfied; a missing flag,
+    # None or False all mean the data should be generated again
+    if state.get("is_satisfied"):
         return "process_structured_data"
-    else:
-        # If user is not satisfied, try again
-        return "generate_structured_data"
+    return "generate_structured_data"
 
 
 # Add edges between nodes
@@ -49,8 +46,14 @@ graph_builder.add_edge("process_structured_data", END)
 # Set the entry point
 graph_builder.set_entry_point("generate_structured_data")
 
-# Create memory saver for state persistence
-memory = MemorySaver()
+# Persist checkpoints in SQLite so state survives restarts and does not
+# accumulate in process memory. WAL mode lets readers run alongside writes.
+checkpoint_conn = sqlite3.connect(
+    os.getenv("CHECKPOINT_DB", "checkpoints.sqlite"),
+    check_same_thread=False
+)
+checkpoint_conn.execute("PRAGMA journal_mode=WAL")
+memory = SqliteSaver(checkpoint_conn)
 
 # Compile the graph with checkpointing
 graph = graph_builder.compile(checkpointer=memory)
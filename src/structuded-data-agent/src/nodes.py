@@ -1,15 +1,89 @@
 """Node implementations for structured data extraction."""
 
+import hashlib
 import json
+import os
+from functools import lru_cache
+from pathlib import Path
 from typing import Any, Dict
 
+import httpx
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.types import interrupt
+from pydantic import ValidationError
 
 from src.schemas import StructuredData
 from src.state import State
 
+MODEL_NAME = "gpt-4-turbo"
+
+# Extraction results are cached on disk, keyed by model, schema and prompt
+CACHE_DIR = Path(os.getenv("EXTRACTION_CACHE_DIR", ".cache/structured_data"))
+
+# Prompt templates are fixed text, so every request starts with the same
+# prefix and OpenAI can serve it from its prompt cache.
+EXTRACTION_PROMPT = """Extract structured information from this text: "{text}".
+Identify the type of request, the main entity, and relevant attributes.
+If dates are mentioned, include them in ISO format (YYYY-MM-DD).
+Add appropriate tags for categorization.
+Make sure to include relevant key-value pairs in the attributes field.
+"""
+
+FEEDBACK_PROMPT = """
+IMPORTANT: The previous extraction needs improvement.
+User feedback: {feedback}
+Please update the extraction based on this feedback.
+"""
+
+
+@lru_cache(maxsize=1)
+def get_structured_model():
+    """Create the extraction model once and reuse it across graph runs.
+
+    Reusing the client also keeps its connections to the OpenAI API open
+    between requests.
+    """
+    # A keep-alive HTTP/2 pool reuses connections to the OpenAI API
+    http_client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+    model = ChatOpenAI(model=MODEL_NAME, temperature=0, http_client=http_client)
+
+    # Use structured output to guarantee schema compliance
+    return model.with_structured_output(
+        StructuredData,
+        method="function_calling"
+    )
+
+
+@lru_cache(maxsize=1)
+def _schema_fingerprint() -> str:
+    """Hash of the StructuredData schema; changing the schema invalidates the cache."""
+    schema = json.dumps(StructuredData.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()
+
+
+def extract_structured_data(prompt: str) -> StructuredData:
+    """Run the extraction prompt, or return the stored result of an identical one.
+
+    The model runs at temperature 0, so repeating a prompt would produce the
+    same extraction; a cache hit skips the LLM call entirely.
+    """
+    key = hashlib.sha256(
+        "\0".join((MODEL_NAME, _schema_fingerprint(), prompt)).encode()
+    ).hexdigest()
+    path = CACHE_DIR / f"{key}.json"
+
+    if path.exists():
+        return StructuredData.model_validate_json(path.read_bytes())
+
+    structured_data = get_structured_model().invoke(prompt)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(structured_data.model_dump_json(), encoding="utf-8")
+    return structured_data
+
 
 def generate_structured_data(state: State) -> Dict[str, Any]:
     """Extract structured data from user input using LLM with structured output.
@@ -23,9 +97,6 @@ def generate_structured_data(state: State) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Updated state with structured data
     """
-    # Create OpenAI model
-    model = ChatOpenAI(model="gpt-4-turbo", temperature=0)
-
     # Get the latest user message or use original text if we're regenerating
     if state.get("is_satisfied") is False and state.get("original_text"):
         # We're regenerating after feedback
@@ -38,46 +109,33 @@ def generate_structured_data(state: State) -> Dict[str, Any]:
                 feedback = message.content
                 break
 
-        system_prompt = f"""Extract structured information from this text: "{original_text}".
-            Identify the type of request, the main entity, and relevant attributes.
-            If dates are mentioned, include them in ISO format (YYYY-MM-DD).
-            Add appropriate tags for categorization.
-            Make sure to include relevant key-value pairs in the attributes field.
-            
-            IMPORTANT: The previous extraction needs improvement.
-            User feedback: {feedback}
-            Please update the extraction based on this feedback.
-            """
+        system_prompt = (
+            EXTRACTION_PROMPT.format(text=original_text)
+            + FEEDBACK_PROMPT.format(feedback=feedback)
+        )
     else:
         # First-time extraction
         last_message = state["messages"][-1]
         original_text = last_message.content
 
-        system_prompt = f"""Extract structured information from this text: "{original_text}".
-            Identify the type of request, the main entity, and relevant attributes.
-            If dates are mentioned, include them in ISO format (YYYY-MM-DD).
-            Add appropriate tags for categorization.
-            Make sure to include relevant key-value pairs in the attributes field.
-            """
-
-    # Use structured output to guarantee schema compliance
-    model_with_structure = model.with_structured_output(
-        StructuredData,
-        method="function_calling"
-    )
+        system_prompt = EXTRACTION_PROMPT.format(text=original_text)
 
     # Call model with the user input
-    structured_data = model_with_structure.invoke(system_prompt)
+    structured_data = extract_structured_data(system_prompt)
+
+    # Serialize once; later nodes reuse the JSON from state
+    structured_data_json = structured_data.model_dump_json(indent=2)
 
     # Create response message
     ai_message = AIMessage(
-        content=f"I've extracted the following structured data:\n```json\n{json.dumps(structured_data.model_dump(), indent=2)}\n```"
+        content=f"I've extracted the following structured data:\n```json\n{structured_data_json}\n```"
     )
 
     # Update state
     return {
         "messages": [ai_message],
         "structured_data": structured_data,
+        "structured_data_json": structured_data_json,
         "is_satisfied": None,  # Will be set by human feedback
         "original_text": original_text,
     }
@@ -117,29 +175,33 @@ def get_human_feedback(state: State) -> Dict[str, Any]:
     # If user provided modified data, use it
     modified_data = human_response.get("modified_data")
     if is_satisfied and modified_data:
+        # Validate first; messages are only built for the outcome
         try:
-            # Use modified data if provided
             updated_data = StructuredData.model_validate(modified_data)
-
+        except ValidationError as e:
+            # Report the first problem with the modified data
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
             ai_message = AIMessage(
-                content="Thank you for the corrections! The structured data has been updated."
-            )
-
-            return {
-                "messages": [ai_message],
-                "structured_data": updated_data,
-                "is_satisfied": True
-            }
-        except Exception as e:
-            # If there's an error processing the modified data
-            ai_message = AIMessage(
-                content=f"Error processing modified data: {str(e)}"
+                content=f"Error processing modified data: {location}: {error['msg']}"
+                if location else f"Error processing modified data: {error['msg']}"
             )
             return {
                 "messages": [ai_message],
                 "is_satisfied": False
             }
 
+        ai_message = AIMessage(
+            content="Thank you for the corrections! The structured data has been updated."
+        )
+
+        return {
+            "messages": [ai_message],
+            "structured_data": updated_data,
+            "structured_data_json": updated_data.model_dump_json(indent=2),
+            "is_satisfied": True
+        }
+
     # Create message based on satisfaction
     if is_satisfied:
         message = AIMessage(
@@ -191,9 +253,15 @@ def process_structured_data(state: State) -> Dict[str, Any]:
         tags_str = ", ".join(structured_data.tags)
         summary += f" Tags: {tags_str}."
 
+    # Reuse the JSON serialized when the data was generated or updated
+    structured_data_json = (
+        state.get("structured_data_json")
+        or structured_data.model_dump_json(indent=2)
+    )
+
     # Create final message
     ai_message = AIMessage(
-        content=f"{summary}\n\nFull structured data:\n```json\n{json.dumps(structured_data.model_dump(), indent=2)}\n```"
+        content=f"{summary}\n\nFull structured data:\n```json\n{structured_data_json}\n```"
     )
 
     # Return updated state
@@ -1,8 +1,8 @@
 """Schemas for structured data extraction."""
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class StructuredData(BaseModel):
@@ -11,14 +11,26 @@ class StructuredData(BaseModel):
     This is a general-purpose schema that can handle various types of information
     extracted from user text. It's flexible enough to represent different kinds
     of data while maintaining a consistent structure.
+    
+    Instances are immutable: nodes replace the model in state rather than
+    editing it, so it never needs revalidation after construction. Unknown
+    fields are rejected, so a mistyped field in user corrections is reported
+    instead of silently dropped.
     """
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True,
+        validate_assignment=False,
+        str_strip_whitespace=True,
+    )
+
     data_type: str = Field(
         description="Type of data extracted (e.g., 'reservation', 'info_request', 'contact')"
     )
     primary_entity: str = Field(
         description="Main entity referenced in the input (person, place, concept, etc.)"
     )
-    attributes: Dict[str, Any] = Field(
+    attributes: Dict[str, Union[str, int, float, bool, List[Any], Dict[str, Any], None]] = Field(
         default_factory=dict,  # Add default empty dictionary
         description="Key attributes of the entity as key-value pairs"
     )
@@ -15,10 +15,12 @@ class State(TypedDict):
     Attributes:
         messages: Chat history between user and agent
         structured_data: Extracted structured data from user input
+        structured_data_json: structured_data serialized once for display
         is_satisfied: Whether the user is satisfied with the extracted data
         original_text: Original user input text
     """
     messages: Annotated[List[BaseMessage], add_messages]
     structured_data: Optional[StructuredData]
+    structured_data_json: Optional[str]
     is_satisfied: Optional[bool]
     original_text: Optional[str]
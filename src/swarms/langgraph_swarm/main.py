@@ -6,6 +6,10 @@ This example creates a two-agent system with:
 - A creative writer (Bob)
 """
 
+import ast
+import operator
+from functools import lru_cache
+
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
@@ -15,10 +19,49 @@ from langgraph_swarm import create_handoff_tool, create_swarm
 # export OPENAI_API_KEY=your_api_key
 model = ChatOpenAI(model="gpt-4o")
 
+# Arithmetic the calculate tool supports; anything else is rejected
+_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+# Keep expressions like 9 ** 9 ** 9 or ((9 ** 999) ** 999) ** 999 from
+# running forever: bound each exponent and the size of every integer power
+MAX_EXPONENT = 1000
+MAX_RESULT_BITS = 100_000
+
+@lru_cache(maxsize=512)
+def _parse(expression):
+    """Parse an expression once; the model often repeats the same one."""
+    return ast.parse(expression, mode="eval").body
+
+def _evaluate(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            if abs(right) > MAX_EXPONENT:
+                raise ValueError(f"Exponent too large: {right}")
+            if isinstance(left, int) and isinstance(right, int) and left.bit_length() * right > MAX_RESULT_BITS:
+                raise ValueError("Result too large")
+        return _OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPS:
+        return _OPS[type(node.op)](_evaluate(node.operand))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
 # Create a simple math function for Alice
 def calculate(expression: str) -> float:
     """Evaluate a mathematical expression"""
-    return eval(expression)
+    # Only numbers and arithmetic operators are evaluated, never arbitrary code
+    return _evaluate(_parse(expression))
 
 # Create Alice - the math expert
 alice = create_react_agent(
@@ -1,16 +1,24 @@
+import asyncio
+import logging
 import os
+from functools import cache, lru_cache
 from typing import Any, Dict, List, Optional
 
+import httpx
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from openai import OpenAI
+from pydantic import BaseModel, ConfigDict
 from swarm import Agent, Swarm
 
 # Load environment variables
 load_dotenv()
 
+# Request tracing is logged at DEBUG, so it costs nothing at the default level
+logger = logging.getLogger(__name__)
+
 # Define Result class
 
 
@@ -26,45 +34,63 @@ class Result:
 # Initialize FastAPI app
 app = FastAPI(title="Swarm Agent API")
 
-# Add CORS middleware
+# Add CORS middleware. Only the web frontend may call the API; it sends
+# JSON POSTs without cookies. FRONTEND_ORIGIN takes a comma-separated list.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=os.getenv("FRONTEND_ORIGIN", "http://localhost:3000").split(","),
+    allow_credentials=False,
+    allow_methods=["POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
 )
 
-# Initialize Swarm client
-client = Swarm()
+# Initialize Swarm client. The HTTP client is shared by all requests in this
+# worker, so connections to the OpenAI API stay open between them and
+# concurrent requests are multiplexed over HTTP/2.
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+openai_client = OpenAI(http_client=http_client)
+client = Swarm(client=openai_client)
+
+# The forwarded history grows from MESSAGE_WINDOW_MIN to MESSAGE_WINDOW_MAX
+# messages before it is cut back, so most turns send the same prefix as the
+# previous one and hit OpenAI's prompt cache.
+MESSAGE_WINDOW_MIN = 10
+MESSAGE_WINDOW_MAX = 20
+
+# Messages that leave the window are folded into a short summary, kept in
+# context_variables["summary"] and shown to the agents, so earlier context
+# isn't lost when the window restarts. context_variables["summarized_messages"]
+# counts the messages the summary covers.
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_MAX_TOKENS = 200
 
 # Agent functions
 
 
 def transfer_to_finnish():
     """Transfer the conversation to the Finnish-speaking agent."""
-    print("Transferring to Finnish-speaking agent...")
-    return finnish_agent
+    logger.debug("Transferring to Finnish-speaking agent")
+    return get_finnish_agent()
 
 
 def transfer_to_weather():
     """Transfer the conversation to the weather agent."""
-    print("Transferring to weather agent...")
-    return weather_agent
+    logger.debug("Transferring to weather agent")
+    return get_weather_agent()
 
 
 def update_user_info(context_variables, name, location=None):
     """Update user information in context variables."""
-    new_context = {"user_name": name}
+    # Copy the current context and set the new values on the copy
+    result_context = dict(context_variables)
+    result_context["user_name"] = name
     if location:
-        new_context["location"] = location
-
-    print(f"Updated user info: {name} from {location}")
-    print(f"Current context: {context_variables}")
+        result_context["location"] = location
 
-    # Create new context that includes current and new values
-    result_context = {**context_variables, **new_context}
-    print(f"Updated context: {result_context}")
+    logger.debug("Updated context: %s", result_context)
 
     return Result(
         value=f"Updated your information: {name} from {location or 'unknown location'}",
@@ -72,138 +98,258 @@ def update_user_info(context_variables, name, location=None):
     )
 
 
-# Main agent
-main_agent = Agent(
-    name="Assistant",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a helpful assistant.
+@lru_cache(maxsize=1024)
+def _main_instructions(user_name, location, summary):
+    """Build the main agent's instructions, reused for a repeated user and location."""
+    instructions = f"""You are a helpful assistant.
 If the user wants to speak in Finnish or mentions Finland, transfer to the Finnish-speaking agent using transfer_to_finnish().
 If the user asks about weather information, transfer to the weather agent using transfer_to_weather().
 You can update user information using the update_user_info function.
-Current user info: {context_variables.get('user_name', 'Unknown')} from {context_variables.get('location', 'Unknown location')}
+Current user info: {user_name} from {location}
 
 When user asks to update their information or change their name or location, use the update_user_info function with appropriate parameters.
-""",
-    functions=[transfer_to_finnish, transfer_to_weather, update_user_info]
-)
+"""
+    if summary:
+        instructions += f"\nSummary of the earlier conversation: {summary}\n"
+    return instructions
+
+
+# Main agent
+@cache
+def get_main_agent():
+    """Create the main assistant on first use."""
+    return Agent(
+        name="Assistant",
+        model="gpt-4o",
+        instructions=lambda context_variables: _main_instructions(
+            str(context_variables.get('user_name', 'Unknown')),
+            str(context_variables.get('location', 'Unknown location')),
+            str(context_variables.get('summary', '')),
+        ),
+        functions=[transfer_to_finnish, transfer_to_weather, update_user_info]
+    )
+
 
 # Function for Finnish agent
 
 
 def transfer_to_assistant():
     """Transfer back to the main assistant agent."""
-    print("Returning to main assistant...")
-    return main_agent
+    logger.debug("Returning to main assistant")
+    return get_main_agent()
 
 
-# Finnish agent
-finnish_agent = Agent(
-    name="Finnish Agent",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a helpful agent who speaks ONLY in Finnish.
+@lru_cache(maxsize=1024)
+def _finnish_instructions(user_name, location, summary):
+    """Build the Finnish agent's instructions, reused for a repeated user and location."""
+    instructions = f"""You are a helpful agent who speaks ONLY in Finnish.
 Always respond in Finnish, regardless of the language the user is using.
-Current user: {context_variables.get('user_name', 'friend')} from {context_variables.get('location', 'somewhere')}
+Current user: {user_name} from {location}
 If the user wants to stop speaking Finnish, transfer them back to the main assistant using transfer_to_assistant().
-""",
-    functions=[transfer_to_assistant]
-)
+"""
+    if summary:
+        instructions += f"\nSummary of the earlier conversation: {summary}\n"
+    return instructions
+
+
+# Finnish agent
+@cache
+def get_finnish_agent():
+    """Create the Finnish-speaking agent on first use."""
+    return Agent(
+        name="Finnish Agent",
+        model="gpt-4o",
+        instructions=lambda context_variables: _finnish_instructions(
+            str(context_variables.get('user_name', 'friend')),
+            str(context_variables.get('location', 'somewhere')),
+            str(context_variables.get('summary', '')),
+        ),
+        functions=[transfer_to_assistant]
+    )
+
 
 # Weather agent function
 
 
+# Simple weather data
+WEATHER_DATA = {
+    "New York": "Sunny, 75°F",
+    "London": "Rainy, 60°F",
+    "Tokyo": "Cloudy, 70°F",
+    "Sydney": "Clear, 80°F",
+    "Helsinki": "Snow, 25°F (-4°C)",
+}
+
+
 def get_weather(location=None):
     """Get weather information for a location."""
     if not location:
         location = "Helsinki"
 
-    # Simple weather data
-    weather_data = {
-        "New York": "Sunny, 75°F",
-        "London": "Rainy, 60°F",
-        "Tokyo": "Cloudy, 70°F",
-        "Sydney": "Clear, 80°F",
-        "Helsinki": "Snow, 25°F (-4°C)",
-    }
-
-    weather = weather_data.get(
+    weather = WEATHER_DATA.get(
         location, f"Weather data not available for {location}")
     return f"The current weather in {location} is: {weather}"
 
 
-# Weather agent
-weather_agent = Agent(
-    name="Weather Expert",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a weather expert who helps users find weather information.
+@lru_cache(maxsize=1024)
+def _weather_instructions(user_name, location, summary):
+    """Build the weather agent's instructions, reused for a repeated user and location."""
+    instructions = f"""You are a weather expert who helps users find weather information.
 You have access to the get_weather function to check current conditions.
-Current user: {context_variables.get('user_name', 'visitor')} from {context_variables.get('location', 'unknown location')}
+Current user: {user_name} from {location}
 If the user wants to discuss something other than weather, transfer them back to the assistant using transfer_to_assistant().
-""",
-    functions=[get_weather, transfer_to_assistant]
-)
+"""
+    if summary:
+        instructions += f"\nSummary of the earlier conversation: {summary}\n"
+    return instructions
+
+
+# Weather agent
+@cache
+def get_weather_agent():
+    """Create the weather agent on first use."""
+    return Agent(
+        name="Weather Expert",
+        model="gpt-4o",
+        instructions=lambda context_variables: _weather_instructions(
+            str(context_variables.get('user_name', 'visitor')),
+            str(context_variables.get('location', 'unknown location')),
+            str(context_variables.get('summary', '')),
+        ),
+        functions=[get_weather, transfer_to_assistant]
+    )
+
+
+@cache
+def get_sender_to_agent():
+    """Map each agent's name to the agent, to find who wrote a message."""
+    return {
+        agent.name: agent
+        for agent in (get_main_agent(), get_finnish_agent(), get_weather_agent())
+    }
 
 # Pydantic models for API
 
 
+class ChatMessage(BaseModel):
+    """A chat message; only the fields the API reads are kept."""
+    model_config = ConfigDict(extra="ignore")
+
+    role: str
+    content: Optional[str] = None
+    sender: Optional[str] = None
+
+
 class SwarmRequest(BaseModel):
-    messages: List[Dict[str, Any]]
+    messages: List[ChatMessage]
     context_variables: Optional[Dict[str, Any]] = {}
 
 
+# Roles the Swarm client accepts from API callers
+ALLOWED_ROLES = frozenset(("user", "assistant", "system"))
+
+# Sent when a request has no usable messages
+DEFAULT_MESSAGES = ({"role": "user", "content": "Hello"},)
+
+
+def window_start(message_count: int) -> int:
+    """Return the index of the first message to forward to the agents.
+
+    The start only moves in steps of MESSAGE_WINDOW_MAX - MESSAGE_WINDOW_MIN,
+    so the window grows between steps. It depends on nothing but the message
+    count, so every worker picks the same start for a conversation without
+    keeping any state.
+    """
+    if message_count <= MESSAGE_WINDOW_MAX:
+        return 0
+    step = MESSAGE_WINDOW_MAX - MESSAGE_WINDOW_MIN
+    return (message_count - MESSAGE_WINDOW_MIN) // step * step
+
+
+def summarize_messages(summary: str, messages: List[ChatMessage]) -> str:
+    """Fold messages into the running conversation summary."""
+    transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages if msg.content)
+    if summary:
+        transcript = f"Summary so far: {summary}\n\n{transcript}"
+
+    completion = openai_client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        messages=[
+            {
+                "role": "system",
+                "content": "Summarize this conversation in under 150 words. "
+                           "Keep names, locations, requests and decisions.",
+            },
+            {"role": "user", "content": transcript},
+        ],
+    )
+    return completion.choices[0].message.content or summary
+
+
 @app.post("/api/swarm")
 async def swarm_chat(request: SwarmRequest):
     try:
         # Log the request
-        print(f"Received request with {len(request.messages)} messages")
+        logger.debug("Received request with %d messages", len(request.messages))
 
         # Limit message count to avoid context issues
-        if len(request.messages) > 10:
-            request.messages = request.messages[-10:]
-            print(f"Truncated to {len(request.messages)} messages")
+        start = window_start(len(request.messages))
+
+        # Get context variables
+        context = request.context_variables or {}
+        summary = str(context.get("summary", ""))
+        summarized = context.get("summarized_messages", 0)
+        if not isinstance(summarized, int) or not 0 <= summarized <= len(request.messages):
+            # The summary belongs to another conversation; start it over
+            summary, summarized = "", 0
+            context = {**context, "summary": summary, "summarized_messages": summarized}
+
+        # Summarize the messages that have left the window since the last
+        # summary. If that fails, answer without it and retry on the next turn.
+        if start > summarized:
+            try:
+                summary = await asyncio.to_thread(
+                    summarize_messages, summary, request.messages[summarized:start])
+            except Exception:
+                logger.warning("Could not summarize earlier messages", exc_info=True)
+            else:
+                context = {**context, "summary": summary, "summarized_messages": start}
+        request.messages = request.messages[start:]
+        logger.debug("Context variables: %s", context)
 
         # Clean messages to the correct format
-        clean_messages = []
-        for msg in request.messages:
-            if msg.get("role") in ["user", "assistant", "system"]:
-                content = msg.get("content")
-                if content is not None:
-                    clean_messages.append({
-                        "role": msg.get("role"),
-                        "content": content
-                    })
-
-        # Ensure there's at least one message
+        clean_messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in request.messages
+            if msg.role in ALLOWED_ROLES and msg.content is not None
+        ]
+
+        # Ensure there's at least one message. The list is a fresh copy, and
+        # Swarm deep-copies messages, so the shared default is never modified
         if not clean_messages:
-            clean_messages = [{"role": "user", "content": "Hello"}]
+            clean_messages = list(DEFAULT_MESSAGES)
 
-        # Get context variables
-        context = request.context_variables or {}
-        print(f"Context variables: {context}")
-
-        # Identify current agent
-        current_agent = main_agent
-        for msg in reversed(request.messages):
-            if msg.get("sender") == "Finnish Agent":
-                current_agent = finnish_agent
-                break
-            elif msg.get("sender") == "Weather Expert":
-                current_agent = weather_agent
-                break
-
-        print(f"Using agent: {current_agent.name}")
-
-        # Run the Swarm client
-        response = client.run(
+        # Identify current agent from the latest message that has a sender
+        last_sender = next(
+            (msg.sender for msg in reversed(request.messages) if msg.sender), None)
+        current_agent = get_sender_to_agent().get(last_sender) or get_main_agent()
+
+        logger.debug("Using agent: %s", current_agent.name)
+
+        # Run the Swarm client in a worker thread; it blocks on the OpenAI
+        # request and would otherwise stall every other request on the loop
+        response = await asyncio.to_thread(
+            client.run,
             agent=current_agent,
             messages=clean_messages,
             context_variables=context,
             stream=False
         )
 
-        print(
-            f"Got response from Swarm with {len(response.messages)} messages")
-        print(f"Response agent: {response.agent.name}")
-        print(f"Response context: {response.context_variables}")
+        logger.debug("Got response from Swarm with %d messages", len(response.messages))
+        logger.debug("Response agent: %s", response.agent.name)
+        logger.debug("Response context: %s", response.context_variables)
 
         # Return formatted response
         return {
@@ -212,12 +358,12 @@ async def swarm_chat(request: SwarmRequest):
             "context_variables": response.context_variables
         }
 
-    except Exception as e:
-        print(f"Error: {str(e)}")
+    except Exception:
+        logger.exception("Swarm request failed")
 
         # Return a simple response in error cases
         return {
-            "messages": request.messages + [{
+            "messages": [msg.model_dump(exclude_none=True) for msg in request.messages] + [{
                 "role": "assistant",
                 "content": "I'm sorry, I encountered an error. Could you try again?",
                 "sender": "Assistant"
@@ -226,6 +372,14 @@ async def swarm_chat(request: SwarmRequest):
             "context_variables": request.context_variables or {}
         }
 
-# Run the app
+# Run the app. Set DEV=1 for a single auto-reloading process; otherwise
+# WEB_CONCURRENCY worker processes serve requests in parallel.
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
+    dev = os.getenv("DEV") == "1"
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=dev,
+        workers=None if dev else int(os.getenv("WEB_CONCURRENCY", "4")),
+    )
@@ -1,4 +1,8 @@
+from functools import cache, lru_cache
+
+import httpx
 from dotenv import load_dotenv
+from openai import OpenAI
 from swarm import Agent, Swarm
 
 load_dotenv()
@@ -14,8 +18,12 @@ class Result:
         self.context_variables = context_variables or {}
 
 
-# Initialize the Swarm client
-client = Swarm()
+# Initialize the Swarm client with a keep-alive HTTP/2 connection pool
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+client = Swarm(client=OpenAI(http_client=http_client))
 
 # Define specialized agents
 
@@ -25,13 +33,13 @@ client = Swarm()
 def transfer_to_finnish():
     """Transfer the conversation to the Finnish-speaking agent."""
     print("Siirretään keskustelu suomenkieliselle agentille...")
-    return finnish_agent
+    return get_finnish_agent()
 
 
 def transfer_to_weather():
     """Transfer the conversation to the weather agent."""
     print("Transferring to weather agent...")
-    return weather_agent
+    return get_weather_agent()
 
 
 def update_user_info(context_variables, name, location=None):
@@ -57,17 +65,30 @@ def update_user_info(context_variables, name, location=None):
     )
 
 
-main_agent = Agent(
-    name="Assistant",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a helpful assistant.
+@lru_cache(maxsize=1024)
+def _main_instructions(user_name, location):
+    """Build the main agent's instructions, reused for a repeated user and location."""
+    return f"""You are a helpful assistant.
 If the user wants to speak in Finnish or mentions Finland, transfer to the Finnish-speaking agent.
 If the user asks about weather information, transfer to the weather agent.
 You can update user information using the update_user_info function.
-Current user info: {context_variables.get('user_name', 'Unknown')} from {context_variables.get('location', 'Unknown location')}
-""",
-    functions=[transfer_to_finnish, transfer_to_weather, update_user_info]
-)
+Current user info: {user_name} from {location}
+"""
+
+
+@cache
+def get_main_agent():
+    """Create the main assistant on first use."""
+    return Agent(
+        name="Assistant",
+        model="gpt-4o",
+        instructions=lambda context_variables: _main_instructions(
+            str(context_variables.get('user_name', 'Unknown')),
+            str(context_variables.get('location', 'Unknown location')),
+        ),
+        functions=[transfer_to_finnish, transfer_to_weather, update_user_info]
+    )
+
 
 # Finnish agent that speaks in Finnish
 
@@ -75,23 +96,46 @@ Current user info: {context_variables.get('user_name', 'Unknown')} from {context
 def transfer_to_assistant():
     """Transfer back to the main assistant agent."""
     print("Palataan takaisin pääassistenttiin...")
-    return main_agent
+    return get_main_agent()
 
 
-finnish_agent = Agent(
-    name="Finnish Agent",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a helpful agent who speaks ONLY in Finnish.
+@lru_cache(maxsize=1024)
+def _finnish_instructions(user_name, location):
+    """Build the Finnish agent's instructions, reused for a repeated user and location."""
+    return f"""You are a helpful agent who speaks ONLY in Finnish.
 Always respond in Finnish, regardless of the language the user is using.
-Current user: {context_variables.get('user_name', 'friend')} from {context_variables.get('location', 'somewhere')}
+Current user: {user_name} from {location}
 If the user wants to stop speaking Finnish, transfer them back to the main assistant.
-""",
-    functions=[transfer_to_assistant]
-)
+"""
+
+
+@cache
+def get_finnish_agent():
+    """Create the Finnish-speaking agent on first use."""
+    return Agent(
+        name="Finnish Agent",
+        model="gpt-4o",
+        instructions=lambda context_variables: _finnish_instructions(
+            str(context_variables.get('user_name', 'friend')),
+            str(context_variables.get('location', 'somewhere')),
+        ),
+        functions=[transfer_to_assistant]
+    )
+
 
 # Weather agent for weather information
 
 
+# Sample weather data; a production system would call a weather API
+WEATHER_DATA = {
+    "New York": "Sunny, 75°F",
+    "London": "Rainy, 60°F",
+    "Tokyo": "Cloudy, 70°F",
+    "Sydney": "Clear, 80°F",
+    "Helsinki": "Snow, 25°F",
+}
+
+
 def get_weather(location=None):
     """Get the weather for a location.
 
@@ -101,30 +145,34 @@ def get_weather(location=None):
     if not location:
         return "Please specify a location to check the weather."
 
-    # This would be a real API call in a production system
-    weather_data = {
-        "New York": "Sunny, 75°F",
-        "London": "Rainy, 60°F",
-        "Tokyo": "Cloudy, 70°F",
-        "Sydney": "Clear, 80°F",
-        "Helsinki": "Snow, 25°F",
-    }
-
-    weather = weather_data.get(
+    weather = WEATHER_DATA.get(
         location, f"Weather data not available for {location}")
     return f"The current weather in {location} is: {weather}"
 
 
-weather_agent = Agent(
-    name="Weather Expert",
-    model="gpt-4o",
-    instructions=lambda context_variables: f"""You are a weather expert who helps users find weather information.
+@lru_cache(maxsize=1024)
+def _weather_instructions(user_name, location):
+    """Build the weather agent's instructions, reused for a repeated user and location."""
+    return f"""You are a weather expert who helps users find weather information.
 You have access to the get_weather function to check current conditions.
-Current user: {context_variables.get('user_name', 'visitor')} from {context_variables.get('location', 'unknown location')}
+Current user: {user_name} from {location}
 If the user wants to discuss something other than weather, transfer them back to the assistant.
-""",
-    functions=[get_weather, transfer_to_assistant]
-)
+"""
+
+
+@cache
+def get_weather_agent():
+    """Create the weather agent on first use."""
+    return Agent(
+        name="Weather Expert",
+        model="gpt-4o",
+        instructions=lambda context_variables: _weather_instructions(
+            str(context_variables.get('user_name', 'visitor')),
+            str(context_variables.get('location', 'unknown location')),
+        ),
+        functions=[get_weather, transfer_to_assistant]
+    )
+
 
 # Function to run a simple demo
 
@@ -143,7 +191,7 @@ def run_demo():
     # Run the interactive demo loop
     # The first argument should be positional, not a keyword argument
     run_demo_loop(
-        main_agent,
+        get_main_agent(),
         context_variables=initial_context,
         stream=True
     )
@@ -14,6 +14,19 @@ interface Message {
   sender?: string;
 }
 
+/**
+ * Context variables shared with the Swarm service
+ * @property user_name - Name of the user
+ * @property location - Location of the user
+ * Other keys (such as the conversation summary) are set by the service and
+ * must be sent back unchanged.
+ */
+interface ContextVariables {
+  user_name?: string;
+  location?: string;
+  [key: string]: unknown;
+}
+
 /**
  * API request to Swarm service
  * @property messages - All conversation history messages
@@ -21,10 +34,7 @@ interface Message {
  */
 interface SwarmRequest {
   messages: Message[];
-  context_variables: {
-    user_name: string;
-    location?: string;
-  };
+  context_variables: ContextVariables;
 }
 
 /**
@@ -33,10 +43,7 @@ interface SwarmRequest {
 interface SwarmResponse {
   messages: Message[];
   agent_name: string;
-  context_variables?: {
-    user_name?: string;
-    location?: string;
-  };
+  context_variables?: ContextVariables;
 }
 
 export default function ChatInterface() {
@@ -45,6 +52,7 @@ export default function ChatInterface() {
   const [userName, setUserName] = useState("Vieras");
   const [location, setLocation] = useState<string | undefined>("Helsinki");
   const [currentAgent, setCurrentAgent] = useState("Assistant");
+  const [contextVariables, setContextVariables] = useState<ContextVariables>({});
   const [loading, setLoading] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -71,6 +79,7 @@ export default function ChatInterface() {
       const requestData: SwarmRequest = {
         messages: [...messages, userMessage],
         context_variables: {
+          ...contextVariables,
           user_name: userName,
           location,
         },
@@ -142,6 +151,11 @@ export default function ChatInterface() {
    * Update user information from response
    */
   const updateUserInfoFromResponse = (response: SwarmResponse): void => {
+    // Keep every context variable so the service gets them back next time
+    if (response.context_variables) {
+      setContextVariables(response.context_variables);
+    }
+
     if (
       response.context_variables?.user_name &&
       response.context_variables.user_name !== userName